@@ -1,15 +1,20 @@
 from turnip.clients.openai_client import OpenAIClient, get_openai_rate_limiter, set_openai_rate_limit
 from turnip.program import Program
 from turnip.scope import scope
+from turnip.tracing import Tracer
 from turnip.errors import DataCorruptionError, MapExecutionError, MissingRunContextError
+from turnip.models import JobState, MapPlan
 
 
 __all__ = [
     "DataCorruptionError",
+    "JobState",
+    "MapPlan",
     "MapExecutionError",
     "MissingRunContextError",
     "OpenAIClient",
     "Program",
+    "Tracer",
     "get_openai_rate_limiter",
     "scope",
     "set_openai_rate_limit",
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
 import asyncio
+import math
+from collections import deque
 from collections.abc import Callable, Mapping
 from typing import Any
 
 from openai import APIConnectionError, APITimeoutError, AsyncOpenAI, RateLimitError
 
+from turnip.tracing import add_rate_limit_wait
+
 
 # Global rate limiter for OpenAI API requests
 _DEFAULT_MAX_OPENAI_REQUESTS = 10
@@ -56,6 +60,13 @@ class OpenAIClient:
 
     Request kwargs are passed directly to the OpenAI SDK methods.
     Raw SDK responses are returned unchanged.
+
+    Hedging is opt-in via `hedge_percentile`: once `hedge_min_samples` latencies have
+    been observed, a request still running that percentile of the recent `hedge_window`
+    latencies after it acquired the rate limiter gets a duplicate. The first to succeed
+    wins and the other is cancelled. Hedges draw from a token bucket refilled by
+    `hedge_budget` tokens per request and capped at `hedge_budget * hedge_window`, so
+    a quiet period cannot bank a large burst of hedges.
     """
 
     def __init__(
@@ -69,10 +80,26 @@ class OpenAIClient:
         max_backoff: float = 8.0,
         client_kwargs: Mapping[str, Any] | None = None,
         rate_limiter: asyncio.Semaphore | None = None,
+        hedge_percentile: float | None = None,
+        hedge_budget: float = 0.05,
+        hedge_min_samples: int = 20,
+        hedge_window: int = 256,
     ) -> None:
         if max_retries < 0:
             raise ValueError("max_retries must be >= 0")
 
+        if hedge_percentile is not None and not 0 < hedge_percentile < 100:
+            raise ValueError("hedge_percentile must be in (0, 100)")
+
+        if not 0 <= hedge_budget <= 1:
+            raise ValueError("hedge_budget must be in [0, 1]")
+
+        if hedge_min_samples <= 0:
+            raise ValueError("hedge_min_samples must be > 0")
+
+        if hedge_window < hedge_min_samples:
+            raise ValueError("hedge_window must be >= hedge_min_samples")
+
         if initial_backoff <= 0:
             raise ValueError("initial_backoff must be > 0")
 
@@ -82,6 +109,9 @@ class OpenAIClient:
         self.max_retries = max_retries
         self.initial_backoff = initial_backoff
         self.max_backoff = max_backoff
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget
+        self.hedge_min_samples = hedge_min_samples
 
         kwargs = dict(client_kwargs or {})
         kwargs.setdefault("timeout", timeout)
@@ -95,6 +125,9 @@ class OpenAIClient:
         self._rate_limiter = rate_limiter or get_openai_rate_limiter()
         self._throttle_lock = asyncio.Lock()
         self._throttle_until = 0.0
+        self._latencies: deque[float] = deque(maxlen=hedge_window)
+        self._hedge_capacity = max(1.0, hedge_budget * hedge_window)
+        self._hedge_tokens = 0.0
 
         # messages = [{'user': 'Do some stuff'}]
 
@@ -133,22 +166,100 @@ class OpenAIClient:
         while True:
             await self._wait_for_throttle()
             try:
-                async with self._rate_limiter:
-                    return await func(**kwargs)
+                return await self._send_with_hedge(func, **kwargs)
             except (APITimeoutError, APIConnectionError, RateLimitError) as exc:
                 if attempt >= self.max_retries:
                     raise
                 delay = self._compute_retry_delay(exc, attempt)
                 await self._set_throttle(delay)
                 await asyncio.sleep(delay)
+                if isinstance(exc, RateLimitError):
+                    add_rate_limit_wait(delay)
                 attempt += 1
 
+    async def _send(
+        self,
+        func: Callable[..., Any],
+        kwargs: Mapping[str, Any],
+        *,
+        acquired: asyncio.Event | None = None,
+        record_cancelled: bool = False,
+        attribute_wait: bool = True,
+    ) -> Any:
+        loop = asyncio.get_running_loop()
+        waiting = loop.time()
+        async with self._rate_limiter:
+            started = loop.time()
+            if attribute_wait:
+                add_rate_limit_wait(started - waiting)
+            if acquired is not None:
+                acquired.set()
+            # Failures count too, and a cancelled straggler is recorded as a lower bound;
+            # sampling only winners would drag the percentile down. Rate-limit errors
+            # return fast and say nothing about server latency, so they are skipped.
+            record = True
+            try:
+                return await func(**kwargs)
+            except asyncio.CancelledError:
+                record = record_cancelled
+                raise
+            except RateLimitError:
+                record = False
+                raise
+            finally:
+                if record:
+                    self._latencies.append(loop.time() - started)
+
+    async def _send_with_hedge(self, func: Callable[..., Any], **kwargs: Any) -> Any:
+        self._hedge_tokens = min(self._hedge_capacity, self._hedge_tokens + self.hedge_budget)
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is None:
+            return await self._send(func, kwargs)
+
+        acquired = asyncio.Event()
+        primary = asyncio.create_task(self._send(func, kwargs, acquired=acquired, record_cancelled=True))
+        tasks = [primary, asyncio.create_task(acquired.wait())]
+        try:
+            # Queueing on the local rate limiter says nothing about server latency, so the
+            # hedge clock starts only once the primary holds the limiter.
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            done, _ = await asyncio.wait([primary], timeout=hedge_delay)
+            if done or self._hedge_tokens < 1:
+                return await primary
+
+            self._hedge_tokens -= 1
+            # The hedge overlaps the primary in wall time, so its limiter wait is not
+            # added to the caller's span a second time.
+            hedge = asyncio.create_task(self._send(func, kwargs, attribute_wait=False))
+            tasks.append(hedge)
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Both copies can finish in the same wakeup; read every exception so a
+                # losing copy's error is never reported as unretrieved.
+                winners = [task for task in done if task.exception() is None]
+                if winners:
+                    return winners[0].result()
+            # both copies failed; surface the primary error to the retry loop
+            return primary.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _hedge_delay(self) -> float | None:
+        if self.hedge_percentile is None or len(self._latencies) < self.hedge_min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        rank = math.ceil(self.hedge_percentile / 100 * len(ordered)) - 1
+        return ordered[max(0, rank)]
+
     async def _wait_for_throttle(self) -> None:
         loop = asyncio.get_running_loop()
         async with self._throttle_lock:
             delay = self._throttle_until - loop.time()
         if delay > 0:
             await asyncio.sleep(delay)
+            add_rate_limit_wait(delay)
 
     async def _set_throttle(self, seconds: float) -> None:
         loop = asyncio.get_running_loop()
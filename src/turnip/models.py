@@ -2,6 +2,11 @@ from dataclasses import dataclass
 from enum import StrEnum
 
 
+# Scope path segment for `scope.gather` children. Not a valid Python identifier, so no
+# @scope function can produce the same segment.
+BRANCH_SEGMENT = "<branch>"
+
+
 class ScopeStatus(StrEnum):
     SUCCESS = "success"
     ERROR = "error"
@@ -20,3 +25,43 @@ class ScopeRecord:
     exception_type: str | None
     exception_message: str | None
     traceback_text: str | None
+
+
+class JobState(StrEnum):
+    COMPLETE = "complete"
+    FAILED = "failed"
+    MISSING = "missing"
+
+
+@dataclass(slots=True)
+class JobRecord:
+    key: str
+    trial: int
+    attempt: int
+    status: ScopeStatus
+
+
+@dataclass(slots=True)
+class PlannedJob:
+    index: int
+    key: str
+    trial: int
+    state: JobState
+    attempt: int
+
+
+@dataclass(slots=True)
+class MapPlan:
+    stage: str
+    jobs: list[PlannedJob]
+
+    @property
+    def counts(self) -> dict[JobState, int]:
+        counts = {state: 0 for state in JobState}
+        for job in self.jobs:
+            counts[job.state] += 1
+        return counts
+
+    @property
+    def incomplete(self) -> list[PlannedJob]:
+        return [job for job in self.jobs if job.state != JobState.COMPLETE]
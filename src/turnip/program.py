@@ -2,26 +2,79 @@ from __future__ import annotations
 
 import asyncio
 import json
-from collections.abc import Awaitable, Callable
+import logging
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, TypeVar
+from typing import Any, Literal, TypeVar
 
 from turnip.errors import FailedMapItem, MapExecutionError
+from turnip.models import JobState, MapPlan, PlannedJob, ScopeStatus
 from turnip.scope import RunContext, reset_run_context, set_run_context
-from turnip.storage import ExperimentStorage
+from turnip.storage import ExperimentStorage, utc_now_iso
+from turnip.tracing import Tracer
 
 T = TypeVar("T")
 
+logger = logging.getLogger(__name__)
+
 
 def _default_db_path(experiment: str) -> Path:
     return Path(".turnip") / "experiments" / f"{experiment}.sqlite3"
 
 
 class Program:
-    def __init__(self, experiment: str, config: dict[str, Any], *, db_path: str | Path | None = None) -> None:
+    def __init__(
+        self,
+        experiment: str,
+        config: dict[str, Any],
+        *,
+        db_path: str | Path | None = None,
+        read_connections: int = 4,
+    ) -> None:
+        if read_connections < 0:
+            raise ValueError("read_connections must be >= 0")
         self.experiment = experiment
         self.config = config
         self.db_path = Path(db_path) if db_path is not None else _default_db_path(experiment)
+        self.read_connections = read_connections
+        self._storage: ExperimentStorage | None = None
+
+    async def __aenter__(self) -> Program:
+        if self._storage is not None:
+            raise RuntimeError("program session is already open")
+        self._storage = await self._open_storage(read_connections=self.read_connections)
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self._storage is not None:
+            await self._storage.close()
+            self._storage = None
+
+    async def plan(
+        self,
+        stage: str,
+        items: list[dict[str, Any]],
+        *,
+        key: str | Callable[[dict[str, Any]], str],
+        repeat: int = 1,
+    ) -> MapPlan:
+        """Classify each `(key, trial)` job of `stage` as complete, failed or missing.
+
+        Job outcomes are only recorded by `map` calls made since `job_runs` was added.
+        The root job function is never a scope, so outcomes cannot be recovered from
+        older `scope_calls` rows: on such databases every job starts out missing and the
+        first `only="incomplete"` pass re-enters all of them. Finished jobs then only
+        replay cached scopes, and later passes run just the failures.
+        """
+        if repeat <= 0:
+            raise ValueError("repeat must be > 0")
+
+        async with self._session(upsert_config=False) as storage:
+            return await self._plan(storage, stage, items, key=key, repeat=repeat)
 
     async def map(
         self,
@@ -32,63 +85,182 @@ class Program:
         stage: str | None = None,
         key: str | Callable[[dict[str, Any]], str],
         max_concurrency: int = 32,
+        only: Literal["all", "incomplete"] = "all",
+        tracer: Tracer | None = None,
     ) -> list[T]:
         if repeat <= 0:
             raise ValueError("repeat must be > 0")
         if max_concurrency <= 0:
             raise ValueError("max_concurrency must be > 0")
+        if only not in ("all", "incomplete"):
+            raise ValueError("only must be 'all' or 'incomplete'")
 
         stage_name = stage or fn.__name__
-        storage = ExperimentStorage(self.db_path)
-        await storage.connect()
-        await storage.upsert_experiment(self.experiment, json.dumps(self.config))
+        async with self._session() as storage:
+            return await self._map(
+                fn,
+                items,
+                storage,
+                stage_name,
+                repeat=repeat,
+                key=key,
+                max_concurrency=max_concurrency,
+                only=only,
+                tracer=tracer,
+            )
 
-        jobs: list[tuple[int, dict[str, Any], str, int]] = []
-        for i, item in enumerate(items):
-            item_key = self._extract_key(item, key)
-            for trial in range(repeat):
-                jobs.append((i, item, item_key, trial))
+    async def _map(
+        self,
+        fn: Callable[[dict[str, Any]], Awaitable[T]],
+        items: list[dict[str, Any]],
+        storage: ExperimentStorage,
+        stage_name: str,
+        *,
+        repeat: int,
+        key: str | Callable[[dict[str, Any]], str],
+        max_concurrency: int,
+        only: Literal["all", "incomplete"],
+        tracer: Tracer | None,
+    ) -> list[T]:
+        plan = await self._plan(storage, stage_name, items, key=key, repeat=repeat)
+        trace_run = tracer.new_run() if tracer is not None else ""
+        jobs = plan.incomplete if only == "incomplete" else plan.jobs
 
         semaphore = asyncio.Semaphore(max_concurrency)
 
-        async def run_job(index: int, item: dict[str, Any], item_key: str, trial: int) -> tuple[int, str, int, T]:
+        async def run_job(job: PlannedJob) -> T:
             context = RunContext(
                 experiment=self.experiment,
                 stage=stage_name,
-                key=item_key,
-                trial=trial,
+                key=job.key,
+                trial=job.trial,
                 storage=storage,
+                tracer=tracer if tracer is not None and tracer.selects(job.key, job.trial) else None,
+                trace_run=trace_run,
             )
             token = set_run_context(context)
-            context.stack.append(f"{fn.__name__}[0]")
+            root = f"{fn.__name__}[0]"
+            context.stack.append(root)
             try:
                 async with semaphore:
-                    value = await fn(item)
-                return index, item_key, trial, value
+                    started_at = utc_now_iso()
+                    try:
+                        with context.trace(root) as span:
+                            if span is not None:
+                                span.attempt = job.attempt + 1
+                            value = await fn(items[job.index])
+                    except Exception as exc:
+                        try:
+                            await storage.insert_job_record(
+                                experiment=self.experiment,
+                                stage=stage_name,
+                                key=job.key,
+                                trial=job.trial,
+                                status=ScopeStatus.ERROR,
+                                exception_type=type(exc).__name__,
+                                exception_message=str(exc),
+                                started_at=started_at,
+                                finished_at=utc_now_iso(),
+                            )
+                        except Exception as record_exc:
+                            # keep the job's own error; the recording failure is secondary
+                            exc.add_note(f"failed to record job outcome: {type(record_exc).__name__}: {record_exc}")
+                        raise
+                    # Already-complete jobs are not re-recorded, so fully cached passes stay write-free.
+                    if job.state != JobState.COMPLETE:
+                        try:
+                            await storage.insert_job_record(
+                                experiment=self.experiment,
+                                stage=stage_name,
+                                key=job.key,
+                                trial=job.trial,
+                                status=ScopeStatus.SUCCESS,
+                                started_at=started_at,
+                                finished_at=utc_now_iso(),
+                            )
+                        except Exception:
+                            # the job finished; losing its record only means a later plan reruns it
+                            logger.warning(
+                                "failed to record success for stage=%s key=%s trial=%s",
+                                stage_name,
+                                job.key,
+                                job.trial,
+                                exc_info=True,
+                            )
+                return value
             finally:
                 context.stack.pop()
                 reset_run_context(token)
 
-        tasks = [asyncio.create_task(run_job(i, item, item_key, trial)) for i, item, item_key, trial in jobs]
+        tasks = [asyncio.create_task(run_job(job)) for job in jobs]
         task_results = await asyncio.gather(*tasks, return_exceptions=True)
 
         failures: list[FailedMapItem] = []
         ordered_results: list[T | None] = [None] * len(jobs)
 
         for job_i, result in enumerate(task_results):
-            item_index, _, item_key, trial = jobs[job_i]
+            job = jobs[job_i]
             if isinstance(result, BaseException):
-                failures.append(FailedMapItem(index=item_index, key=item_key, trial=trial, error=result))
+                failures.append(FailedMapItem(index=job.index, key=job.key, trial=job.trial, error=result))
             else:
-                ordered_results[job_i] = result[3]
-
-        await storage.close()
+                ordered_results[job_i] = result
 
         if failures:
             raise MapExecutionError(stage_name, failures)
 
         return [r for r in ordered_results if r is not None]
 
+    async def _open_storage(self, *, read_connections: int = 0, upsert_config: bool = True) -> ExperimentStorage:
+        storage = ExperimentStorage(self.db_path, read_connections=read_connections)
+        await storage.connect()
+        if not upsert_config:
+            return storage
+        try:
+            await storage.upsert_experiment(self.experiment, json.dumps(self.config))
+        except BaseException:
+            await storage.close()
+            raise
+        return storage
+
+    @asynccontextmanager
+    async def _session(self, *, upsert_config: bool = True) -> AsyncIterator[ExperimentStorage]:
+        if self._storage is not None:
+            yield self._storage
+            return
+
+        # One-off calls read through the writer; a reader pool only pays off for sessions.
+        storage = await self._open_storage(upsert_config=upsert_config)
+        try:
+            yield storage
+        finally:
+            await storage.close()
+
+    async def _plan(
+        self,
+        storage: ExperimentStorage,
+        stage: str,
+        items: list[dict[str, Any]],
+        *,
+        key: str | Callable[[dict[str, Any]], str],
+        repeat: int,
+    ) -> MapPlan:
+        latest = await storage.get_latest_job_records(experiment=self.experiment, stage=stage)
+
+        jobs: list[PlannedJob] = []
+        for i, item in enumerate(items):
+            item_key = self._extract_key(item, key)
+            for trial in range(repeat):
+                record = latest.get((item_key, trial))
+                if record is None:
+                    state, attempt = JobState.MISSING, 0
+                elif record.status == ScopeStatus.SUCCESS:
+                    state, attempt = JobState.COMPLETE, record.attempt
+                else:
+                    state, attempt = JobState.FAILED, record.attempt
+                jobs.append(PlannedJob(index=i, key=item_key, trial=trial, state=state, attempt=attempt))
+
+        return MapPlan(stage=stage, jobs=jobs)
+
     @staticmethod
     def _extract_key(item: dict[str, Any], key: str | Callable[[dict[str, Any]], str]) -> str:
         if isinstance(key, str):
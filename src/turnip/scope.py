@@ -1,17 +1,23 @@
+from __future__ import annotations
+
+import asyncio
 import contextvars
 import json
 import traceback
 from collections import defaultdict
-from collections.abc import Awaitable, Callable
+from collections.abc import Awaitable, Callable, Iterable
+from contextlib import AbstractContextManager, nullcontext
 from dataclasses import dataclass, field
 from functools import wraps
 from typing import Any, TypeVar
 
 from turnip.errors import DataCorruptionError, MissingRunContextError, SerializationError
-from turnip.models import ScopeStatus
+from turnip.models import BRANCH_SEGMENT, ScopeStatus
 from turnip.storage import ExperimentStorage, utc_now_iso
+from turnip.tracing import Span, Tracer
 
 T = TypeVar("T")
+U = TypeVar("U")
 
 
 @dataclass(slots=True)
@@ -23,6 +29,8 @@ class RunContext:
     storage: ExperimentStorage
     stack: list[str] = field(default_factory=list)
     counters: dict[tuple[str, str], int] = field(default_factory=lambda: defaultdict(int))
+    tracer: Tracer | None = None
+    trace_run: str = ""
 
     def current_parent_path(self) -> str:
         return "/".join(self.stack)
@@ -35,6 +43,30 @@ class RunContext:
         segment = f"{fn_name}[{index}]"
         return f"{parent}/{segment}" if parent else segment
 
+    def fork(self, segment: str) -> RunContext:
+        return RunContext(
+            experiment=self.experiment,
+            stage=self.stage,
+            key=self.key,
+            trial=self.trial,
+            storage=self.storage,
+            stack=[*self.stack, segment],
+            tracer=self.tracer,
+            trace_run=self.trace_run,
+        )
+
+    def trace(self, scope_path: str) -> AbstractContextManager[Span | None]:
+        if self.tracer is None:
+            return nullcontext()
+        return self.tracer.span(
+            run=self.trace_run,
+            experiment=self.experiment,
+            stage=self.stage,
+            key=self.key,
+            trial=self.trial,
+            scope=scope_path,
+        )
+
 
 _RUN_CONTEXT: contextvars.ContextVar[RunContext | None] = contextvars.ContextVar("turnip_run_context", default=None)
 
@@ -54,6 +86,83 @@ def get_run_context() -> RunContext:
     return context
 
 
+async def _call_scope(
+    context: RunContext,
+    scope_path: str,
+    span: Span | None,
+    fn: Callable[..., Awaitable[T]],
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+) -> T:
+    latest = await context.storage.get_latest_scope_record(
+        experiment=context.experiment,
+        stage=context.stage,
+        key=context.key,
+        trial=context.trial,
+        scope=scope_path,
+    )
+
+    if latest is not None and latest.status == ScopeStatus.SUCCESS:
+        if span is not None:
+            span.cache_hit = True
+            span.attempt = latest.attempt
+        if latest.data_json is None:
+            raise DataCorruptionError(
+                f"scope '{scope_path}' marked success but has null data (attempt={latest.attempt})"
+            )
+        try:
+            return json.loads(latest.data_json)
+        except json.JSONDecodeError as exc:
+            raise DataCorruptionError(
+                f"scope '{scope_path}' has invalid cached JSON (attempt={latest.attempt})"
+            ) from exc
+
+    next_attempt = 1 if latest is None else latest.attempt + 1
+    if span is not None:
+        span.attempt = next_attempt
+    started_at = utc_now_iso()
+    context.stack.append(scope_path.split("/")[-1])
+    try:
+        result = await fn(*args, **kwargs)
+        try:
+            data_json = json.dumps(result)
+        except (TypeError, ValueError) as exc:
+            raise SerializationError(scope_path, result) from exc
+        finished_at = utc_now_iso()
+        await context.storage.insert_scope_record(
+            experiment=context.experiment,
+            stage=context.stage,
+            key=context.key,
+            trial=context.trial,
+            scope=scope_path,
+            attempt=next_attempt,
+            status=ScopeStatus.SUCCESS,
+            data_json=data_json,
+            started_at=started_at,
+            finished_at=finished_at,
+        )
+        return result
+    except Exception as exc:
+        finished_at = utc_now_iso()
+        await context.storage.insert_scope_record(
+            experiment=context.experiment,
+            stage=context.stage,
+            key=context.key,
+            trial=context.trial,
+            scope=scope_path,
+            attempt=next_attempt,
+            status=ScopeStatus.ERROR,
+            exception_type=type(exc).__name__,
+            exception_message=str(exc),
+            traceback_text=traceback.format_exc(),
+            started_at=started_at,
+            finished_at=finished_at,
+        )
+        raise
+    finally:
+        context.stack.pop()
+
+
 def scope(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
     if not callable(fn):
         raise TypeError("scope decorator requires a callable")
@@ -62,68 +171,75 @@ def scope(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
     async def wrapper(*args: Any, **kwargs: Any) -> T:
         context = get_run_context()
         scope_path = context.next_scope_path(fn.__name__)
+        with context.trace(scope_path) as span:
+            return await _call_scope(context, scope_path, span, fn, args, kwargs)
 
-        latest = await context.storage.get_latest_scope_record(
-            experiment=context.experiment,
-            stage=context.stage,
-            key=context.key,
-            trial=context.trial,
-            scope=scope_path,
-        )
+    return wrapper
 
-        if latest is not None and latest.status == ScopeStatus.SUCCESS:
-            if latest.data_json is None:
-                raise DataCorruptionError(
-                    f"scope '{scope_path}' marked success but has null data (attempt={latest.attempt})"
-                )
-            try:
-                return json.loads(latest.data_json)
-            except json.JSONDecodeError as exc:
-                raise DataCorruptionError(
-                    f"scope '{scope_path}' has invalid cached JSON (attempt={latest.attempt})"
-                ) from exc
-
-        next_attempt = 1 if latest is None else latest.attempt + 1
-        started_at = utc_now_iso()
-        context.stack.append(scope_path.split("/")[-1])
-        try:
-            result = await fn(*args, **kwargs)
-            try:
-                data_json = json.dumps(result)
-            except (TypeError, ValueError) as exc:
-                raise SerializationError(scope_path, result) from exc
-            finished_at = utc_now_iso()
-            await context.storage.insert_scope_record(
-                experiment=context.experiment,
-                stage=context.stage,
-                key=context.key,
-                trial=context.trial,
-                scope=scope_path,
-                attempt=next_attempt,
-                status=ScopeStatus.SUCCESS,
-                data_json=data_json,
-                started_at=started_at,
-                finished_at=finished_at,
-            )
-            return result
-        except Exception as exc:
-            finished_at = utc_now_iso()
-            await context.storage.insert_scope_record(
-                experiment=context.experiment,
-                stage=context.stage,
-                key=context.key,
-                trial=context.trial,
-                scope=scope_path,
-                attempt=next_attempt,
-                status=ScopeStatus.ERROR,
-                exception_type=type(exc).__name__,
-                exception_message=str(exc),
-                traceback_text=traceback.format_exc(),
-                started_at=started_at,
-                finished_at=finished_at,
-            )
-            raise
-        finally:
-            context.stack.pop()
 
-    return wrapper
+async def _run_branch(context: RunContext, aw: Awaitable[T]) -> T:
+    token = set_run_context(context)
+    try:
+        with context.trace(context.current_parent_path()):
+            return await aw
+    finally:
+        reset_run_context(token)
+
+
+async def gather(*aws: Awaitable[T], return_exceptions: bool = False) -> list[T]:
+    """Run awaitables concurrently, each in its own branch of the current scope.
+
+    Branch paths are allocated in argument order before any child starts, so
+    child `i` always records under `<parent>/<branch>[n]/...` regardless of
+    scheduling. Use this instead of `asyncio.gather` when the awaitables call
+    `@scope` functions.
+
+    No child outlives the call: if one raises (and `return_exceptions` is false)
+    or the caller is cancelled, the remaining children are cancelled and awaited
+    before the exception propagates.
+
+    Only coroutine objects are accepted. A `Task` or `Future` is already running in
+    the parent's context, so it cannot be placed in a branch and raises `TypeError`.
+    """
+    if not all(asyncio.iscoroutine(aw) for aw in aws):
+        for aw in aws:
+            if asyncio.iscoroutine(aw):
+                aw.close()
+        raise TypeError("scope.gather accepts coroutine objects only, not tasks or futures")
+
+    context = get_run_context()
+    branches = [context.fork(context.next_scope_path(BRANCH_SEGMENT).split("/")[-1]) for _ in aws]
+    tasks = [asyncio.create_task(_run_branch(branch, aw)) for branch, aw in zip(branches, aws)]
+    try:
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def map_within(
+    fn: Callable[[U], Awaitable[T]],
+    items: Iterable[U],
+    *,
+    max_concurrency: int | None = None,
+    return_exceptions: bool = False,
+) -> list[T]:
+    """Apply `fn` to each item concurrently via `gather`, optionally bounded."""
+    if max_concurrency is not None and max_concurrency <= 0:
+        raise ValueError("max_concurrency must be > 0")
+
+    if max_concurrency is None:
+        return await gather(*(fn(item) for item in items), return_exceptions=return_exceptions)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_one(item: U) -> T:
+        async with semaphore:
+            return await fn(item)
+
+    return await gather(*(run_one(item) for item in items), return_exceptions=return_exceptions)
+
+
+scope.gather = gather  # type: ignore[attr-defined]
+scope.map_within = map_within  # type: ignore[attr-defined]
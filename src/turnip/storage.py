@@ -1,11 +1,159 @@
 from __future__ import annotations
 
+import asyncio
+import sqlite3
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from datetime import UTC, datetime
 from pathlib import Path
 
 import aiosqlite
 
-from .models import ScopeRecord, ScopeStatus
+from .models import JobRecord, ScopeRecord, ScopeStatus
+
+
+# Page cache in KiB when negative (64 MiB), memory-mapped I/O window in bytes (256 MiB).
+_CACHE_SIZE_KIB = 65536
+_MMAP_SIZE_BYTES = 256 * 1024 * 1024
+_CACHED_STATEMENTS = 256
+_DEFAULT_READ_CONNECTIONS = 4
+
+
+# Version 1 stores experiment/stage/key/scope strings once in `interned` and keys
+# rows by integer ids; `scope_calls` and `job_runs` are read-only views over them.
+SCHEMA_VERSION = 1
+
+_SCHEMA_SCRIPT = """
+CREATE TABLE IF NOT EXISTS experiments (
+    experiment TEXT PRIMARY KEY,
+    config_json TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS interned (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    UNIQUE (kind, value)
+);
+
+CREATE TABLE IF NOT EXISTS scope_call_rows (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    experiment_id INTEGER NOT NULL REFERENCES interned(id),
+    stage_id INTEGER NOT NULL REFERENCES interned(id),
+    key_id INTEGER NOT NULL REFERENCES interned(id),
+    trial INTEGER NOT NULL,
+    scope_id INTEGER NOT NULL REFERENCES interned(id),
+    attempt INTEGER NOT NULL,
+    status TEXT NOT NULL CHECK(status IN ('success', 'error')),
+    data_json TEXT,
+    exception_type TEXT,
+    exception_message TEXT,
+    traceback_text TEXT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT NOT NULL
+);
+
+-- Serves uniqueness, cache lookups and latest-attempt scans (read backwards).
+CREATE UNIQUE INDEX IF NOT EXISTS idx_scope_call_attempt
+    ON scope_call_rows (experiment_id, stage_id, key_id, trial, scope_id, attempt);
+
+CREATE TABLE IF NOT EXISTS job_run_rows (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    experiment_id INTEGER NOT NULL REFERENCES interned(id),
+    stage_id INTEGER NOT NULL REFERENCES interned(id),
+    key_id INTEGER NOT NULL REFERENCES interned(id),
+    trial INTEGER NOT NULL,
+    attempt INTEGER NOT NULL,
+    status TEXT NOT NULL CHECK(status IN ('success', 'error')),
+    exception_type TEXT,
+    exception_message TEXT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT NOT NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_job_run_attempt
+    ON job_run_rows (experiment_id, stage_id, key_id, trial, attempt);
+"""
+
+_MIGRATE_LEGACY_SCRIPT = """
+CREATE TABLE IF NOT EXISTS job_runs (
+    experiment TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    key TEXT NOT NULL,
+    trial INTEGER NOT NULL,
+    attempt INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    exception_type TEXT,
+    exception_message TEXT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT NOT NULL
+);
+
+INSERT OR IGNORE INTO interned (kind, value)
+    SELECT 'experiment', experiment FROM scope_calls UNION SELECT 'experiment', experiment FROM job_runs
+    UNION SELECT 'stage', stage FROM scope_calls UNION SELECT 'stage', stage FROM job_runs
+    UNION SELECT 'key', key FROM scope_calls UNION SELECT 'key', key FROM job_runs
+    UNION SELECT 'scope', scope FROM scope_calls;
+
+INSERT INTO scope_call_rows (
+    id, experiment_id, stage_id, key_id, trial, scope_id, attempt, status, data_json,
+    exception_type, exception_message, traceback_text, started_at, finished_at
+)
+SELECT c.id, e.id, s.id, k.id, c.trial, p.id, c.attempt, c.status, c.data_json,
+       c.exception_type, c.exception_message, c.traceback_text, c.started_at, c.finished_at
+FROM scope_calls c
+JOIN interned e ON e.kind = 'experiment' AND e.value = c.experiment
+JOIN interned s ON s.kind = 'stage' AND s.value = c.stage
+JOIN interned k ON k.kind = 'key' AND k.value = c.key
+JOIN interned p ON p.kind = 'scope' AND p.value = c.scope;
+
+INSERT INTO job_run_rows (
+    experiment_id, stage_id, key_id, trial, attempt, status,
+    exception_type, exception_message, started_at, finished_at
+)
+SELECT e.id, s.id, k.id, j.trial, j.attempt, j.status,
+       j.exception_type, j.exception_message, j.started_at, j.finished_at
+FROM job_runs j
+JOIN interned e ON e.kind = 'experiment' AND e.value = j.experiment
+JOIN interned s ON s.kind = 'stage' AND s.value = j.stage
+JOIN interned k ON k.kind = 'key' AND k.value = j.key;
+
+DROP TABLE scope_calls;
+DROP TABLE job_runs;
+"""
+
+_VIEWS_SCRIPT = """
+CREATE VIEW IF NOT EXISTS scope_calls AS
+SELECT r.id, e.value AS experiment, s.value AS stage, k.value AS key, r.trial, p.value AS scope,
+       r.status, r.data_json, r.exception_type, r.exception_message, r.traceback_text,
+       r.started_at, r.finished_at, r.attempt
+FROM scope_call_rows r
+JOIN interned e ON e.id = r.experiment_id
+JOIN interned s ON s.id = r.stage_id
+JOIN interned k ON k.id = r.key_id
+JOIN interned p ON p.id = r.scope_id;
+
+CREATE VIEW IF NOT EXISTS job_runs AS
+SELECT r.id, e.value AS experiment, s.value AS stage, k.value AS key, r.trial, r.attempt,
+       r.status, r.exception_type, r.exception_message, r.started_at, r.finished_at
+FROM job_run_rows r
+JOIN interned e ON e.id = r.experiment_id
+JOIN interned s ON s.id = r.stage_id
+JOIN interned k ON k.id = r.key_id;
+"""
+
+
+def _split_statements(script: str) -> list[str]:
+    statements: list[str] = []
+    pending = ""
+    for line in script.splitlines(keepends=True):
+        pending += line
+        if sqlite3.complete_statement(pending):
+            statements.append(pending.strip())
+            pending = ""
+    return statements
 
 
 def utc_now_iso() -> str:
@@ -13,63 +161,117 @@ def utc_now_iso() -> str:
 
 
 class ExperimentStorage:
-    def __init__(self, db_path: Path) -> None:
+    """
+    SQLite storage with one writer connection and a pool of read-only WAL readers.
+
+    Each aiosqlite connection runs on its own thread, so cache lookups on readers are
+    not queued behind inserts and commits on the writer. Writes commit before they
+    return, so a reader always sees records the caller has already written. With
+    `read_connections=0` all queries share the writer.
+    """
+
+    def __init__(self, db_path: Path, *, read_connections: int = _DEFAULT_READ_CONNECTIONS) -> None:
+        if read_connections < 0:
+            raise ValueError("read_connections must be >= 0")
         self.db_path = db_path
+        self.read_connections = read_connections
         self._conn: aiosqlite.Connection | None = None
+        self._readers: list[aiosqlite.Connection] = []
+        self._idle_readers: asyncio.Queue[aiosqlite.Connection] | None = None
+        self._ids: dict[tuple[str, str], int] = {}
 
     async def connect(self) -> None:
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self._conn = await aiosqlite.connect(self.db_path)
-        self._conn.row_factory = aiosqlite.Row
+        self._conn = await self._open_connection(self.db_path)
         await self._conn.execute("PRAGMA journal_mode=WAL;")
         await self._conn.execute("PRAGMA synchronous=NORMAL;")
         await self._create_schema()
 
+        if self.read_connections > 0:
+            # Readers open after the schema exists; mode=ro needs the file to be there.
+            uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+            self._idle_readers = asyncio.Queue()
+            for _ in range(self.read_connections):
+                # Autocommit so no implicit BEGIN ever pins a reader to a stale snapshot.
+                reader = await self._open_connection(uri, uri=True, isolation_level=None)
+                self._readers.append(reader)
+                self._idle_readers.put_nowait(reader)
+
     async def close(self) -> None:
+        for reader in self._readers:
+            await reader.close()
+        self._readers.clear()
+        self._idle_readers = None
         if self._conn is not None:
             await self._conn.close()
             self._conn = None
+            self._ids.clear()
+
+    @staticmethod
+    async def _open_connection(
+        database: Path | str,
+        *,
+        uri: bool = False,
+        isolation_level: str | None = "",
+    ) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(
+            database,
+            uri=uri,
+            isolation_level=isolation_level,
+            cached_statements=_CACHED_STATEMENTS,
+        )
+        conn.row_factory = aiosqlite.Row
+        await conn.execute(f"PRAGMA cache_size=-{_CACHE_SIZE_KIB};")
+        await conn.execute(f"PRAGMA mmap_size={_MMAP_SIZE_BYTES};")
+        await conn.execute("PRAGMA temp_store=MEMORY;")
+        return conn
+
+    @asynccontextmanager
+    async def _reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        if self._idle_readers is None:
+            yield self._require_conn()
+            return
+        reader = await self._idle_readers.get()
+        try:
+            yield reader
+        finally:
+            self._idle_readers.put_nowait(reader)
 
     async def _create_schema(self) -> None:
         conn = self._require_conn()
-        await conn.executescript(
-            """
-            CREATE TABLE IF NOT EXISTS experiments (
-                experiment TEXT PRIMARY KEY,
-                config_json TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL
-            );
-
-            CREATE TABLE IF NOT EXISTS scope_calls (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                experiment TEXT NOT NULL,
-                stage TEXT NOT NULL,
-                key TEXT NOT NULL,
-                trial INTEGER NOT NULL,
-                scope TEXT NOT NULL,
-                status TEXT NOT NULL CHECK(status IN ('success', 'error')),
-                data_json TEXT,
-                exception_type TEXT,
-                exception_message TEXT,
-                traceback_text TEXT,
-                started_at TEXT NOT NULL,
-                finished_at TEXT NOT NULL,
-                attempt INTEGER NOT NULL DEFAULT 1,
-                FOREIGN KEY (experiment) REFERENCES experiments(experiment)
-            );
-
-            CREATE UNIQUE INDEX IF NOT EXISTS idx_scope_unique_attempt
-                ON scope_calls (experiment, stage, key, trial, scope, attempt);
-
-            CREATE INDEX IF NOT EXISTS idx_scope_lookup
-                ON scope_calls (experiment, stage, key, trial, scope, status);
-
-            CREATE INDEX IF NOT EXISTS idx_scope_latest_attempt
-                ON scope_calls (experiment, stage, key, trial, scope, attempt DESC);
-            """
-        )
-        await conn.commit()
+        if await self._schema_version(conn) >= SCHEMA_VERSION:
+            return
+
+        # IMMEDIATE takes the write lock up front (waiting on the busy timeout), so
+        # concurrent connections upgrading the same file serialize instead of failing
+        # with 'database is locked'; whoever goes second sees the new version.
+        await conn.execute("BEGIN IMMEDIATE;")
+        try:
+            version = await self._schema_version(conn)
+            if version < SCHEMA_VERSION:
+                if version > 0:
+                    raise RuntimeError(f"unsupported storage schema version {version}")
+
+                rows = await conn.execute_fetchall(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'scope_calls'"
+                )
+                script = _SCHEMA_SCRIPT
+                if rows:
+                    script += _MIGRATE_LEGACY_SCRIPT
+                script += _VIEWS_SCRIPT
+                # executescript would COMMIT first, so run statements inside our transaction.
+                for statement in _split_statements(script):
+                    await conn.execute(statement)
+                await conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION};")
+            await conn.commit()
+        except BaseException:
+            await conn.rollback()
+            raise
+
+    @staticmethod
+    async def _schema_version(conn: aiosqlite.Connection) -> int:
+        rows = await conn.execute_fetchall("PRAGMA user_version;")
+        return next(iter(rows))[0]
 
     async def upsert_experiment(self, experiment: str, config_json: str) -> None:
         conn = self._require_conn()
@@ -94,28 +296,29 @@ class ExperimentStorage:
         trial: int,
         scope: str,
     ) -> ScopeRecord | None:
-        conn = self._require_conn()
-        cursor = await conn.execute(
-            """
-            SELECT experiment, stage, key, trial, scope, attempt, status, data_json,
-                   exception_type, exception_message, traceback_text
-            FROM scope_calls
-            WHERE experiment = ? AND stage = ? AND key = ? AND trial = ? AND scope = ?
-            ORDER BY attempt DESC
-            LIMIT 1
-            """,
-            (experiment, stage, key, trial, scope),
-        )
-        row = await cursor.fetchone()
-        await cursor.close()
-        if row is None:
+        async with self._reader() as conn:
+            ids = await self._lookup_ids(conn, experiment=experiment, stage=stage, key=key, scope=scope)
+            if ids is None:
+                return None
+            rows = await conn.execute_fetchall(
+                """
+                SELECT attempt, status, data_json, exception_type, exception_message, traceback_text
+                FROM scope_call_rows
+                WHERE experiment_id = ? AND stage_id = ? AND key_id = ? AND trial = ? AND scope_id = ?
+                ORDER BY attempt DESC
+                LIMIT 1
+                """,
+                (ids["experiment"], ids["stage"], ids["key"], trial, ids["scope"]),
+            )
+        if not rows:
             return None
+        row = next(iter(rows))
         return ScopeRecord(
-            experiment=row["experiment"],
-            stage=row["stage"],
-            key=row["key"],
-            trial=row["trial"],
-            scope=row["scope"],
+            experiment=experiment,
+            stage=stage,
+            key=key,
+            trial=trial,
+            scope=scope,
             attempt=row["attempt"],
             status=ScopeStatus(row["status"]),
             data_json=row["data_json"],
@@ -144,19 +347,19 @@ class ExperimentStorage:
         conn = self._require_conn()
         await conn.execute(
             """
-            INSERT INTO scope_calls (
-                experiment, stage, key, trial, scope, attempt,
+            INSERT INTO scope_call_rows (
+                experiment_id, stage_id, key_id, trial, scope_id, attempt,
                 status, data_json, exception_type, exception_message,
                 traceback_text, started_at, finished_at
             )
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
-                experiment,
-                stage,
-                key,
+                await self._intern("experiment", experiment),
+                await self._intern("stage", stage),
+                await self._intern("key", key),
                 trial,
-                scope,
+                await self._intern("scope", scope),
                 attempt,
                 status.value,
                 data_json,
@@ -169,6 +372,109 @@ class ExperimentStorage:
         )
         await conn.commit()
 
+    async def get_latest_job_records(self, *, experiment: str, stage: str) -> dict[tuple[str, int], JobRecord]:
+        async with self._reader() as conn:
+            ids = await self._lookup_ids(conn, experiment=experiment, stage=stage)
+            if ids is None:
+                return {}
+            # SQLite takes bare columns from the row holding MAX(attempt), so this is a
+            # single range scan over idx_job_run_attempt.
+            rows = await conn.execute_fetchall(
+                """
+                SELECT k.value AS key, r.trial, r.status, MAX(r.attempt) AS attempt
+                FROM job_run_rows r
+                JOIN interned k ON k.id = r.key_id
+                WHERE r.experiment_id = ? AND r.stage_id = ?
+                GROUP BY r.key_id, r.trial
+                """,
+                (ids["experiment"], ids["stage"]),
+            )
+        return {
+            (row["key"], row["trial"]): JobRecord(
+                key=row["key"],
+                trial=row["trial"],
+                attempt=row["attempt"],
+                status=ScopeStatus(row["status"]),
+            )
+            for row in rows
+        }
+
+    async def insert_job_record(
+        self,
+        *,
+        experiment: str,
+        stage: str,
+        key: str,
+        trial: int,
+        status: ScopeStatus,
+        started_at: str,
+        finished_at: str,
+        exception_type: str | None = None,
+        exception_message: str | None = None,
+    ) -> None:
+        conn = self._require_conn()
+        # The attempt is numbered inside the INSERT so concurrent runs of the same
+        # (key, trial) - duplicate keys, overlapping maps - never collide on it.
+        await conn.execute(
+            """
+            INSERT INTO job_run_rows (
+                experiment_id, stage_id, key_id, trial, attempt, status,
+                exception_type, exception_message, started_at, finished_at
+            )
+            SELECT :experiment_id, :stage_id, :key_id, :trial, COALESCE(MAX(attempt), 0) + 1, :status,
+                   :exception_type, :exception_message, :started_at, :finished_at
+            FROM job_run_rows
+            WHERE experiment_id = :experiment_id AND stage_id = :stage_id AND key_id = :key_id AND trial = :trial
+            """,
+            {
+                "experiment_id": await self._intern("experiment", experiment),
+                "stage_id": await self._intern("stage", stage),
+                "key_id": await self._intern("key", key),
+                "trial": trial,
+                "status": status.value,
+                "exception_type": exception_type,
+                "exception_message": exception_message,
+                "started_at": started_at,
+                "finished_at": finished_at,
+            },
+        )
+        await conn.commit()
+
+    async def _intern(self, kind: str, value: str) -> int:
+        cached = self._ids.get((kind, value))
+        if cached is not None:
+            return cached
+        conn = self._require_conn()
+        # DO UPDATE (rather than DO NOTHING) so RETURNING yields the id of an existing row.
+        # execute_fetchall steps the statement to completion in one worker call, so a
+        # concurrent commit on the writer never sees it in progress.
+        rows = await conn.execute_fetchall(
+            """
+            INSERT INTO interned (kind, value) VALUES (?, ?)
+            ON CONFLICT(kind, value) DO UPDATE SET value = excluded.value
+            RETURNING id
+            """,
+            (kind, value),
+        )
+        interned_id = next(iter(rows))[0]
+        self._ids[(kind, value)] = interned_id
+        return interned_id
+
+    async def _lookup_ids(self, conn: aiosqlite.Connection, **values: str) -> dict[str, int] | None:
+        """Resolve interned ids without inserting; None if any value was never stored."""
+        ids: dict[str, int] = {}
+        for kind, value in values.items():
+            cached = self._ids.get((kind, value))
+            if cached is None:
+                rows = await conn.execute_fetchall(
+                    "SELECT id FROM interned WHERE kind = ? AND value = ?", (kind, value)
+                )
+                if not rows:
+                    return None
+                cached = self._ids[(kind, value)] = next(iter(rows))[0]
+            ids[kind] = cached
+        return ids
+
     def _require_conn(self) -> aiosqlite.Connection:
         if self._conn is None:
             raise RuntimeError("storage is not connected")
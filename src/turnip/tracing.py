@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import contextvars
+import hashlib
+import json
+import secrets
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from turnip.models import BRANCH_SEGMENT, ScopeStatus
+
+
+@dataclass(slots=True)
+class Span:
+    run: str
+    experiment: str
+    stage: str
+    key: str
+    trial: int
+    scope: str
+    start_ns: int
+    end_ns: int | None = None
+    cache_hit: bool = False
+    attempt: int | None = None
+    status: ScopeStatus = ScopeStatus.SUCCESS
+    rate_limit_wait_s: float = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.scope.rsplit("/", 1)[-1]
+
+    @property
+    def parent(self) -> str | None:
+        return self.scope.rsplit("/", 1)[0] if "/" in self.scope else None
+
+    @property
+    def lane(self) -> str:
+        """Path of the innermost `scope.gather` branch containing this span ("" for the job root)."""
+        segments = self.scope.split("/")
+        for i in range(len(segments) - 1, -1, -1):
+            if segments[i].startswith(f"{BRANCH_SEGMENT}["):
+                return "/".join(segments[: i + 1])
+        return ""
+
+
+_CURRENT_SPAN: contextvars.ContextVar[Span | None] = contextvars.ContextVar("turnip_current_span", default=None)
+
+
+def add_rate_limit_wait(seconds: float) -> None:
+    """Attribute time spent waiting on a rate limiter to the innermost active span."""
+    span = _CURRENT_SPAN.get()
+    if span is not None and seconds > 0:
+        span.rate_limit_wait_s += seconds
+
+
+class Tracer:
+    """
+    Collects one span per `@scope` call, `scope.gather` branch and job root during `Program.map`.
+
+    `select` limits tracing to a subset of jobs by `(key, trial)`; by default every
+    job is traced. Spans can be exported as Chrome trace-event JSON (chrome://tracing,
+    Perfetto) or as OTLP/JSON for OpenTelemetry collectors.
+    """
+
+    def __init__(self, *, select: Callable[[str, int], bool] | None = None) -> None:
+        self.select = select
+        self.spans: list[Span] = []
+
+    def selects(self, key: str, trial: int) -> bool:
+        return self.select is None or self.select(key, trial)
+
+    def new_run(self) -> str:
+        """Return a nonce identifying one `Program.map` call, so reruns get distinct trace ids."""
+        return secrets.token_hex(8)
+
+    @contextmanager
+    def span(self, *, run: str, experiment: str, stage: str, key: str, trial: int, scope: str) -> Iterator[Span]:
+        span = Span(
+            run=run,
+            experiment=experiment,
+            stage=stage,
+            key=key,
+            trial=trial,
+            scope=scope,
+            start_ns=time.time_ns(),
+        )
+        token = _CURRENT_SPAN.set(span)
+        try:
+            yield span
+        except BaseException:
+            span.status = ScopeStatus.ERROR
+            raise
+        finally:
+            _CURRENT_SPAN.reset(token)
+            span.end_ns = time.time_ns()
+            self.spans.append(span)
+
+    def to_chrome_trace(self) -> dict[str, Any]:
+        # One thread per job run and gather branch: spans on a thread must nest, and
+        # concurrent branches would otherwise overlap.
+        threads: dict[tuple[str, str, str, int, str], int] = {}
+        events: list[dict[str, Any]] = []
+        for span in sorted(self.spans, key=lambda s: s.start_ns):
+            lane = (span.run, span.stage, span.key, span.trial, span.lane)
+            if lane not in threads:
+                threads[lane] = len(threads) + 1
+                label = f"{span.stage}:{span.key}#{span.trial}"
+                events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": 1,
+                        "tid": threads[lane],
+                        "args": {"name": f"{label} {span.lane}" if span.lane else label},
+                    }
+                )
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": "cache_hit" if span.cache_hit else "scope",
+                    "ph": "X",
+                    "ts": span.start_ns / 1000,
+                    "dur": (_end_ns(span) - span.start_ns) / 1000,
+                    "pid": 1,
+                    "tid": threads[lane],
+                    "args": {
+                        "scope": span.scope,
+                        "parent": span.parent,
+                        "cache_hit": span.cache_hit,
+                        "attempt": span.attempt,
+                        "status": span.status.value,
+                        "rate_limit_wait_s": span.rate_limit_wait_s,
+                    },
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_otlp(self) -> dict[str, Any]:
+        spans: list[dict[str, Any]] = []
+        for span in self.spans:
+            trace_id = _hex_id(f"{span.run}/{span.experiment}/{span.stage}/{span.key}/{span.trial}", 32)
+            otlp_span: dict[str, Any] = {
+                "traceId": trace_id,
+                "spanId": _hex_id(f"{trace_id}/{span.scope}", 16),
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(_end_ns(span)),
+                "attributes": [
+                    _attribute("turnip.experiment", span.experiment),
+                    _attribute("turnip.stage", span.stage),
+                    _attribute("turnip.key", span.key),
+                    _attribute("turnip.trial", span.trial),
+                    _attribute("turnip.scope", span.scope),
+                    _attribute("turnip.cache_hit", span.cache_hit),
+                    _attribute("turnip.rate_limit_wait_s", span.rate_limit_wait_s),
+                ],
+                "status": {"code": 1 if span.status == ScopeStatus.SUCCESS else 2},
+            }
+            if span.attempt is not None:
+                otlp_span["attributes"].append(_attribute("turnip.attempt", span.attempt))
+            if span.parent is not None:
+                otlp_span["parentSpanId"] = _hex_id(f"{trace_id}/{span.parent}", 16)
+            spans.append(otlp_span)
+
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [_attribute("service.name", "turnip")]},
+                    "scopeSpans": [{"scope": {"name": "turnip"}, "spans": spans}],
+                }
+            ]
+        }
+
+    def export_chrome_trace(self, path: str | Path) -> None:
+        _write_json(Path(path), self.to_chrome_trace())
+
+    def export_otlp(self, path: str | Path) -> None:
+        _write_json(Path(path), self.to_otlp())
+
+
+def _end_ns(span: Span) -> int:
+    return span.end_ns if span.end_ns is not None else span.start_ns
+
+
+def _hex_id(value: str, length: int) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()[:length]
+
+
+def _attribute(key: str, value: str | int | float | bool) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": value}}
+
+
+def _write_json(path: Path, payload: dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload))
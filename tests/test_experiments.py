@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import sqlite3
 from pathlib import Path
 
 import pytest
 
-from turnip import MapExecutionError, MissingRunContextError, Program, scope
+from turnip import JobState, MapExecutionError, MissingRunContextError, Program, Tracer, scope
 
 
 def read_scope_rows(db_path: Path) -> list[tuple]:
@@ -23,6 +25,35 @@ def read_scope_rows(db_path: Path) -> list[tuple]:
     return rows
 
 
+def create_legacy_db(db_path: Path) -> None:
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        """
+        CREATE TABLE experiments (
+            experiment TEXT PRIMARY KEY, config_json TEXT NOT NULL,
+            created_at TEXT NOT NULL, updated_at TEXT NOT NULL
+        );
+        CREATE TABLE scope_calls (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            experiment TEXT NOT NULL, stage TEXT NOT NULL, key TEXT NOT NULL, trial INTEGER NOT NULL,
+            scope TEXT NOT NULL, status TEXT NOT NULL, data_json TEXT, exception_type TEXT,
+            exception_message TEXT, traceback_text TEXT, started_at TEXT NOT NULL,
+            finished_at TEXT NOT NULL, attempt INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE UNIQUE INDEX idx_scope_unique_attempt
+            ON scope_calls (experiment, stage, key, trial, scope, attempt);
+        INSERT INTO scope_calls (experiment, stage, key, trial, scope, status, exception_type,
+                                 started_at, finished_at, attempt)
+        VALUES ('legacy', 's', 'one', 0, 'workflow[0]/step[0]', 'error', 'RuntimeError', 't0', 't1', 1);
+        INSERT INTO scope_calls (experiment, stage, key, trial, scope, status, data_json,
+                                 started_at, finished_at, attempt)
+        VALUES ('legacy', 's', 'one', 0, 'workflow[0]/step[0]', 'success', '{"cached": true}', 't2', 't3', 2);
+        """
+    )
+    conn.commit()
+    conn.close()
+
+
 @pytest.mark.asyncio
 async def test_scope_cache_hit_skips_execution(tmp_path: Path) -> None:
     db_path = tmp_path / "demo.sqlite3"
@@ -145,3 +176,448 @@ async def test_non_json_serializable_scope_output_is_recorded_as_error(tmp_path:
     assert len(rows) == 1
     assert rows[0][6] == "error"
     assert rows[0][7] == "SerializationError"
+
+
+@pytest.mark.asyncio
+async def test_scope_gather_assigns_deterministic_branch_paths(tmp_path: Path) -> None:
+    db_path = tmp_path / "gather.sqlite3"
+    executed: list[int] = []
+
+    @scope
+    async def judge(item: dict, i: int) -> dict:
+        # later branches finish first so completion order differs from call order
+        await asyncio.sleep(0.01 * (3 - i))
+        executed.append(i)
+        return {"judge": i, "id": item["id"]}
+
+    @scope
+    async def summarize(verdicts: list[dict]) -> dict:
+        return {"n": len(verdicts)}
+
+    async def workflow(item: dict) -> dict:
+        verdicts = await scope.gather(*(judge(item, i) for i in range(3)))
+        more = await scope.map_within(lambda i: judge(item, i), [0, 1], max_concurrency=1)
+        summary = await summarize(verdicts + more)
+        return {"verdicts": verdicts, "summary": summary}
+
+    program = Program("gather-demo", {"model": "fake"}, db_path=db_path)
+    first = await program.map(workflow, [{"id": "one"}], stage="judge", key="id")
+    second = await program.map(workflow, [{"id": "one"}], stage="judge", key="id")
+
+    assert first == second
+    assert [v["judge"] for v in first[0]["verdicts"]] == [0, 1, 2]
+    assert len(executed) == 5
+
+    scopes = sorted(r[4] for r in read_scope_rows(db_path))
+    assert scopes == [
+        "workflow[0]/<branch>[0]/judge[0]",
+        "workflow[0]/<branch>[1]/judge[0]",
+        "workflow[0]/<branch>[2]/judge[0]",
+        "workflow[0]/<branch>[3]/judge[0]",
+        "workflow[0]/<branch>[4]/judge[0]",
+        "workflow[0]/summarize[0]",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_map_only_incomplete_runs_failed_and_missing_jobs(tmp_path: Path) -> None:
+    db_path = tmp_path / "plan.sqlite3"
+    executed: list[str] = []
+
+    async def workflow(item: dict) -> dict:
+        executed.append(item["id"])
+        if item["id"] == "b" and executed.count("b") == 1:
+            raise RuntimeError("transient")
+        return {"ok": item["id"]}
+
+    program = Program("plan-demo", {"model": "fake"}, db_path=db_path)
+
+    with pytest.raises(MapExecutionError):
+        await program.map(workflow, [{"id": "a"}, {"id": "b"}], stage="s", key="id")
+
+    items = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+    plan = await program.plan("s", items, key="id")
+    assert plan.counts == {JobState.COMPLETE: 1, JobState.FAILED: 1, JobState.MISSING: 1}
+    assert [(j.key, j.state) for j in plan.incomplete] == [("b", JobState.FAILED), ("c", JobState.MISSING)]
+
+    results = await program.map(workflow, items, stage="s", key="id", only="incomplete")
+    assert results == [{"ok": "b"}, {"ok": "c"}]
+    assert executed == ["a", "b", "b", "c"]
+
+    plan = await program.plan("s", items, key="id")
+    assert plan.counts[JobState.COMPLETE] == 3
+    assert await program.map(workflow, items, stage="s", key="id", only="incomplete") == []
+
+
+@pytest.mark.asyncio
+async def test_program_session_reuses_storage_across_maps(tmp_path: Path) -> None:
+    db_path = tmp_path / "session.sqlite3"
+    call_count = {"n": 0}
+
+    @scope
+    async def step(item: dict) -> dict:
+        call_count["n"] += 1
+        return {"ok": item["id"]}
+
+    async def workflow(item: dict) -> dict:
+        return await step(item)
+
+    async with Program("session-demo", {"model": "fake"}, db_path=db_path) as program:
+        storage = program._storage
+        assert storage is not None
+        for i in range(3):
+            assert await program.map(workflow, [{"id": str(i)}], stage="s", key="id") == [{"ok": str(i)}]
+            assert program._storage is storage
+        assert await program.map(workflow, [{"id": "0"}], stage="s", key="id") == [{"ok": "0"}]
+
+    assert program._storage is None
+    assert call_count["n"] == 3
+    assert len(read_scope_rows(db_path)) == 3
+
+
+@pytest.mark.asyncio
+async def test_legacy_schema_is_migrated_in_place(tmp_path: Path) -> None:
+    db_path = tmp_path / "legacy.sqlite3"
+    create_legacy_db(db_path)
+
+    @scope
+    async def step(item: dict) -> dict:
+        return {"cached": False}
+
+    async def workflow(item: dict) -> dict:
+        return await step(item)
+
+    program = Program("legacy", {"model": "fake"}, db_path=db_path)
+    assert await program.map(workflow, [{"id": "one"}, {"id": "two"}], stage="s", key="id") == [
+        {"cached": True},
+        {"cached": False},
+    ]
+
+    rows = read_scope_rows(db_path)
+    assert [(r[2], r[5], r[6]) for r in rows] == [("one", 1, "error"), ("one", 2, "success"), ("two", 1, "success")]
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+    kinds = dict(conn.execute("SELECT name, type FROM sqlite_master WHERE name IN ('scope_calls', 'job_runs')"))
+    indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")}
+    conn.close()
+    assert kinds == {"scope_calls": "view", "job_runs": "view"}
+    assert indexes == {"idx_scope_call_attempt", "idx_job_run_attempt"}
+
+
+@pytest.mark.asyncio
+async def test_tracer_records_scope_tree_for_selected_jobs(tmp_path: Path) -> None:
+    db_path = tmp_path / "trace.sqlite3"
+
+    @scope
+    async def call_judge(i: int) -> dict:
+        return {"judge": i}
+
+    @scope
+    async def turn(item: dict) -> dict:
+        return {"verdicts": await scope.gather(call_judge(0), call_judge(1))}
+
+    async def workflow(item: dict) -> dict:
+        return await turn(item)
+
+    items = [{"id": "a"}, {"id": "b"}]
+    program = Program("trace-demo", {"model": "fake"}, db_path=db_path)
+    await program.map(workflow, items, stage="s", key="id")
+
+    tracer = Tracer(select=lambda key, trial: key == "a")
+    await program.map(workflow, items, stage="s", key="id", tracer=tracer)
+
+    assert {s.key for s in tracer.spans} == {"a"}
+    spans = {s.scope: s for s in tracer.spans}
+    assert set(spans) == {
+        "workflow[0]",
+        "workflow[0]/turn[0]",
+    }
+    assert spans["workflow[0]/turn[0]"].cache_hit
+    assert spans["workflow[0]/turn[0]"].parent == "workflow[0]"
+    assert not spans["workflow[0]"].cache_hit
+
+    tracer = Tracer()
+    await program.map(workflow, [{"id": "c"}], stage="s", key="id", tracer=tracer)
+    spans = {s.scope: s for s in tracer.spans}
+    assert set(spans) == {
+        "workflow[0]",
+        "workflow[0]/turn[0]",
+        "workflow[0]/turn[0]/<branch>[0]",
+        "workflow[0]/turn[0]/<branch>[0]/call_judge[0]",
+        "workflow[0]/turn[0]/<branch>[1]",
+        "workflow[0]/turn[0]/<branch>[1]/call_judge[0]",
+    }
+    judge = spans["workflow[0]/turn[0]/<branch>[1]/call_judge[0]"]
+    assert judge.attempt == 1 and not judge.cache_hit
+    assert judge.lane == "workflow[0]/turn[0]/<branch>[1]"
+
+    # same job again with the same tracer (turn[0] is now a cache hit): a separate
+    # trace whose span ids don't collide with the first run
+    await program.map(workflow, [{"id": "c"}], stage="s", key="id", tracer=tracer)
+
+    otlp = tracer.to_otlp()["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(otlp) == 8
+    assert len({s["traceId"] for s in otlp}) == 2
+    span_ids = {s["spanId"] for s in otlp}
+    assert len(span_ids) == 8
+    parents = [s["parentSpanId"] for s in otlp if "parentSpanId" in s]
+    assert len(parents) == 6
+    assert set(parents) <= span_ids
+
+    tracer.export_chrome_trace(tmp_path / "trace.json")
+    chrome = json.loads((tmp_path / "trace.json").read_text())
+    complete = [e for e in chrome["traceEvents"] if e["ph"] == "X"]
+    assert len(complete) == 8
+    by_tid: dict[int, list[dict]] = {}
+    for event in complete:
+        by_tid.setdefault(event["tid"], []).append(event)
+    # first run: root lane plus one lane per branch; second run: root lane only
+    assert len(by_tid) == 4
+    for events in by_tid.values():
+        events.sort(key=lambda e: e["ts"])
+        for outer, inner in zip(events, events[1:]):
+            # events on one thread must nest (contained) rather than partially overlap
+            assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"] or inner["ts"] >= outer["ts"] + outer["dur"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_jobs_write_without_conflicts(tmp_path: Path) -> None:
+    db_path = tmp_path / "concurrent.sqlite3"
+
+    @scope
+    async def step(item: dict, i: int) -> dict:
+        await asyncio.sleep(0)
+        return {"id": item["id"], "step": i}
+
+    async def workflow(item: dict) -> list[dict]:
+        return [await step(item, i) for i in range(5)]
+
+    items = [{"id": str(i)} for i in range(300)]
+    program = Program("concurrent", {"model": "fake"}, db_path=db_path)
+    first = await program.map(workflow, items, stage="s", key="id", max_concurrency=64)
+    second = await program.map(workflow, items, stage="s", key="id", max_concurrency=64)
+
+    assert first == second
+    rows = read_scope_rows(db_path)
+    assert len(rows) == 1500
+    assert all(r[5] == 1 and r[6] == "success" for r in rows)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("read_connections", [0, 2])
+async def test_concurrent_gather_with_reader_pool(tmp_path: Path, read_connections: int) -> None:
+    db_path = tmp_path / "readers.sqlite3"
+    executed = {"n": 0}
+
+    @scope
+    async def sample(i: int) -> dict:
+        executed["n"] += 1
+        return {"i": i}
+
+    async def workflow(item: dict) -> dict:
+        return {"samples": await scope.map_within(sample, range(4))}
+
+    items = [{"id": str(i)} for i in range(8)]
+    async with Program("readers", {"model": "fake"}, db_path=db_path, read_connections=read_connections) as program:
+        storage = program._storage
+        assert storage is not None and len(storage._readers) == read_connections
+        for reader in storage._readers:
+            with pytest.raises(sqlite3.OperationalError):
+                await reader.execute("DELETE FROM scope_call_rows")
+        first = await program.map(workflow, items, stage="s", key="id")
+        second = await program.map(workflow, items, stage="s", key="id")
+
+    assert first == second
+    assert executed["n"] == 32
+
+
+@pytest.mark.asyncio
+async def test_scope_gather_cancels_siblings_when_a_branch_fails(tmp_path: Path) -> None:
+    db_path = tmp_path / "gather-fail.sqlite3"
+    finished: list[int] = []
+
+    @scope
+    async def bad(i: int) -> dict:
+        raise RuntimeError("boom")
+
+    @scope
+    async def slow(i: int) -> dict:
+        await asyncio.sleep(0.05)
+        finished.append(i)
+        return {"i": i}
+
+    @scope
+    async def branch(i: int) -> dict:
+        return {"i": i}
+
+    async def workflow(item: dict) -> dict:
+        await branch(0)
+        return {"results": await scope.gather(bad(0), slow(1))}
+
+    program = Program("gather-fail", {"model": "fake"}, db_path=db_path)
+    with pytest.raises(MapExecutionError) as exc_info:
+        await program.map(workflow, [{"id": "one"}], stage="s", key="id")
+    assert isinstance(exc_info.value.failures[0].error, RuntimeError)
+
+    await asyncio.sleep(0.1)
+    assert finished == []
+    assert sorted(r[4] for r in read_scope_rows(db_path)) == [
+        "workflow[0]/<branch>[0]/bad[0]",
+        "workflow[0]/branch[0]",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_job_error_survives_failure_to_record_it(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from turnip.storage import ExperimentStorage
+
+    async def broken_insert(self: ExperimentStorage, **kwargs: object) -> None:
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(ExperimentStorage, "insert_job_record", broken_insert)
+
+    async def workflow(item: dict) -> dict:
+        raise ValueError("user bug")
+
+    program = Program("record-fail", {"model": "fake"}, db_path=tmp_path / "record.sqlite3")
+    with pytest.raises(MapExecutionError) as exc_info:
+        await program.map(workflow, [{"id": "one"}], stage="s", key="id")
+
+    error = exc_info.value.failures[0].error
+    assert isinstance(error, ValueError)
+    assert any("disk I/O error" in note for note in error.__notes__)
+
+
+@pytest.mark.asyncio
+async def test_duplicate_keys_and_cached_reruns_record_job_outcomes_safely(tmp_path: Path) -> None:
+    db_path = tmp_path / "dupes.sqlite3"
+
+    @scope
+    async def step(item: dict) -> dict:
+        return {"v": item["v"]}
+
+    async def workflow(item: dict) -> dict:
+        return await step(item)
+
+    items = [{"id": "a", "v": 1}, {"id": "a", "v": 2}]
+    program = Program("dupes", {"model": "fake"}, db_path=db_path)
+    # same (key, trial) twice: the second job resumes the first one's cached scope
+    assert await program.map(workflow, items, stage="s", key="id", max_concurrency=1) == [{"v": 1}, {"v": 1}]
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT attempt, status FROM job_runs ORDER BY attempt").fetchall() == [
+        (1, "success"),
+        (2, "success"),
+    ]
+    conn.close()
+
+    # fully cached reruns of complete jobs write no further job records
+    for _ in range(3):
+        await program.map(workflow, items[:1], stage="s", key="id")
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM job_runs").fetchone()[0] == 2
+    conn.close()
+
+
+@pytest.mark.asyncio
+async def test_failure_to_record_success_keeps_job_result(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from turnip.storage import ExperimentStorage
+
+    async def broken_insert(self: ExperimentStorage, **kwargs: object) -> None:
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(ExperimentStorage, "insert_job_record", broken_insert)
+
+    async def workflow(item: dict) -> dict:
+        return {"ok": item["id"]}
+
+    program = Program("record-ok", {"model": "fake"}, db_path=tmp_path / "record-ok.sqlite3")
+    assert await program.map(workflow, [{"id": "one"}], stage="s", key="id") == [{"ok": "one"}]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_connects_migrate_legacy_schema_once(tmp_path: Path) -> None:
+    from turnip.storage import ExperimentStorage
+
+    db_path = tmp_path / "legacy-race.sqlite3"
+    create_legacy_db(db_path)
+
+    storages = [ExperimentStorage(db_path, read_connections=0) for _ in range(4)]
+    await asyncio.gather(*(storage.connect() for storage in storages))
+    try:
+        assert not any(storage._require_conn().in_transaction for storage in storages)
+    finally:
+        for storage in storages:
+            await storage.close()
+
+    assert [(r[2], r[5], r[6]) for r in read_scope_rows(db_path)] == [("one", 1, "error"), ("one", 2, "success")]
+
+
+@pytest.mark.asyncio
+async def test_reader_pool_is_only_opened_for_sessions(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from turnip.storage import ExperimentStorage
+
+    opened: list[int] = []
+    original_connect = ExperimentStorage.connect
+
+    async def connect(self: ExperimentStorage) -> None:
+        await original_connect(self)
+        opened.append(len(self._readers))
+
+    monkeypatch.setattr(ExperimentStorage, "connect", connect)
+
+    async def workflow(item: dict) -> dict:
+        return {"ok": item["id"]}
+
+    program = Program("pool", {"model": "fake"}, db_path=tmp_path / "pool.sqlite3", read_connections=3)
+    await program.map(workflow, [{"id": "a"}], stage="s", key="id")
+    await program.plan("s", [{"id": "a"}], key="id")
+    async with program:
+        await program.map(workflow, [{"id": "a"}], stage="s", key="id")
+
+    assert opened == [0, 0, 3]
+
+
+@pytest.mark.asyncio
+async def test_plan_outside_session_does_not_write_config(tmp_path: Path) -> None:
+    db_path = tmp_path / "plan-readonly.sqlite3"
+
+    async def workflow(item: dict) -> dict:
+        return {"ok": item["id"]}
+
+    program = Program("plan-readonly", {"model": "fake"}, db_path=db_path)
+    await program.map(workflow, [{"id": "a"}], stage="s", key="id")
+
+    def experiment_row() -> tuple:
+        conn = sqlite3.connect(db_path)
+        row = conn.execute("SELECT config_json, updated_at FROM experiments").fetchone()
+        conn.close()
+        return row
+
+    before = experiment_row()
+    program.config = {"model": "changed"}
+    plan = await program.plan("s", [{"id": "a"}], key="id")
+
+    assert plan.counts[JobState.COMPLETE] == 1
+    assert experiment_row() == before
+
+
+@pytest.mark.asyncio
+async def test_scope_gather_rejects_already_scheduled_tasks(tmp_path: Path) -> None:
+    @scope
+    async def judge(i: int) -> dict:
+        return {"judge": i}
+
+    async def workflow(item: dict) -> dict:
+        task = asyncio.create_task(judge(0))
+        try:
+            with pytest.raises(TypeError):
+                await scope.gather(task, judge(1))
+        finally:
+            await task
+        return {"ok": True}
+
+    program = Program("gather-tasks", {"model": "fake"}, db_path=tmp_path / "gather-tasks.sqlite3")
+    assert await program.map(workflow, [{"id": "one"}], stage="s", key="id") == [{"ok": True}]
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import asyncio
+import gc
+from types import SimpleNamespace
+
+import pytest
+from openai import RateLimitError
+
+from turnip import OpenAIClient, Tracer
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_returns_first_copy_and_cancels_straggler() -> None:
+    client = OpenAIClient(
+        api_key="test",
+        rate_limiter=asyncio.Semaphore(10),
+        hedge_percentile=50,
+        hedge_budget=1.0,
+        hedge_min_samples=4,
+    )
+    calls: list[str] = []
+    cancelled: list[str] = []
+
+    async def fast(**kwargs: str) -> str:
+        calls.append(kwargs["tag"])
+        await asyncio.sleep(0.001)
+        return kwargs["tag"]
+
+    for _ in range(4):
+        await client._request_with_retry(fast, tag="warmup")
+
+    state = {"first": True}
+
+    async def straggler(**kwargs: str) -> str:
+        is_first = state["first"]
+        state["first"] = False
+        calls.append("primary" if is_first else "hedge")
+        try:
+            await asyncio.sleep(5 if is_first else 0.001)
+        except asyncio.CancelledError:
+            cancelled.append("primary")
+            raise
+        return "primary" if is_first else "hedge"
+
+    result = await asyncio.wait_for(client._request_with_retry(straggler), timeout=1)
+    await asyncio.sleep(0)
+
+    assert result == "hedge"
+    assert calls[-2:] == ["primary", "hedge"]
+    assert cancelled == ["primary"]
+    # the cancelled straggler is kept as a lower-bound sample, above every winner
+    assert client._latencies[-1] == max(client._latencies)
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_hedging_respects_budget() -> None:
+    client = OpenAIClient(
+        api_key="test",
+        rate_limiter=asyncio.Semaphore(10),
+        hedge_percentile=50,
+        hedge_budget=0.0,
+        hedge_min_samples=1,
+    )
+    calls = {"n": 0}
+
+    async def slow() -> str:
+        calls["n"] += 1
+        await asyncio.sleep(0.01 * calls["n"])
+        return "ok"
+
+    for _ in range(3):
+        assert await client._request_with_retry(slow) == "ok"
+
+    assert calls["n"] == 3
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_queueing_does_not_trigger_hedges() -> None:
+    client = OpenAIClient(
+        api_key="test",
+        rate_limiter=asyncio.Semaphore(1),
+        hedge_percentile=50,
+        hedge_budget=1.0,
+        hedge_min_samples=4,
+    )
+    calls = {"n": 0}
+
+    async def call(delay: float) -> str:
+        calls["n"] += 1
+        await asyncio.sleep(delay)
+        return "ok"
+
+    for _ in range(4):
+        await client._request_with_retry(call, delay=0.02)
+
+    # each call is faster than p50 once it holds the limiter, but the last ones queue longer than p50
+    results = await asyncio.gather(*(client._request_with_retry(call, delay=0.01) for _ in range(4)))
+
+    assert results == ["ok"] * 4
+    assert calls["n"] == 8
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_hedge_budget_does_not_bank_quiet_periods() -> None:
+    client = OpenAIClient(
+        api_key="test",
+        rate_limiter=asyncio.Semaphore(100),
+        hedge_percentile=50,
+        hedge_budget=0.1,
+        hedge_min_samples=4,
+        hedge_window=20,
+    )
+    calls = {"n": 0}
+
+    async def call(delay: float) -> str:
+        calls["n"] += 1
+        await asyncio.sleep(delay)
+        return "ok"
+
+    for _ in range(100):
+        await client._request_with_retry(call, delay=0.001)
+    calls["n"] = 0
+
+    # after 100 quiet requests the bucket holds at most hedge_budget * hedge_window = 2 hedges
+    await asyncio.gather(*(client._request_with_retry(call, delay=0.05) for _ in range(10)))
+
+    assert calls["n"] == 10 + 2
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_hedge_retrieves_exceptions_of_copies_finishing_together() -> None:
+    loop = asyncio.get_running_loop()
+    unretrieved: list[str] = []
+    previous_handler = loop.get_exception_handler()
+    loop.set_exception_handler(lambda _, ctx: unretrieved.append(ctx["message"]))
+    client = OpenAIClient(
+        api_key="test",
+        rate_limiter=asyncio.Semaphore(10),
+        hedge_percentile=50,
+        hedge_budget=1.0,
+        hedge_min_samples=4,
+    )
+
+    async def fast() -> str:
+        await asyncio.sleep(0.001)
+        return "warmup"
+
+    for _ in range(4):
+        await client._request_with_retry(fast)
+
+    gate = loop.create_future()
+    state = {"first": True}
+
+    async def racing() -> str:
+        is_first = state["first"]
+        state["first"] = False
+        if not is_first:
+            # hedge copy: release both copies in the same loop iteration
+            loop.call_soon(gate.set_result, None)
+        await gate
+        if not is_first:
+            raise RuntimeError("hedge failed")
+        return "primary"
+
+    try:
+        for _ in range(20):
+            state["first"] = True
+            gate = loop.create_future()
+            assert await client._request_with_retry(racing) == "primary"
+        gc.collect()
+        await asyncio.sleep(0)
+    finally:
+        loop.set_exception_handler(previous_handler)
+        await client.close()
+
+    assert not [m for m in unretrieved if "never retrieved" in m]
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_failures_are_not_latency_samples() -> None:
+    client = OpenAIClient(api_key="test", rate_limiter=asyncio.Semaphore(10), max_retries=0)
+    response = SimpleNamespace(request=None, status_code=429, headers={})
+
+    async def limited() -> str:
+        raise RateLimitError("slow down", response=response, body=None)
+
+    async def broken() -> str:
+        raise RuntimeError("server error")
+
+    with pytest.raises(RateLimitError):
+        await client._request_with_retry(limited)
+    assert len(client._latencies) == 0
+
+    with pytest.raises(RuntimeError):
+        await client._request_with_retry(broken)
+    assert len(client._latencies) == 1
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_hedge_copy_wait_is_not_attributed_to_span() -> None:
+    limiter = asyncio.Semaphore(2)
+    client = OpenAIClient(
+        api_key="test",
+        rate_limiter=limiter,
+        hedge_percentile=50,
+        hedge_budget=1.0,
+        hedge_min_samples=4,
+    )
+
+    async def fast() -> str:
+        await asyncio.sleep(0.001)
+        return "warmup"
+
+    for _ in range(4):
+        await client._request_with_retry(fast)
+
+    async def hold_slot() -> None:
+        async with limiter:
+            await asyncio.sleep(0.05)
+
+    state = {"first": True}
+
+    async def straggler() -> str:
+        is_first = state["first"]
+        state["first"] = False
+        await asyncio.sleep(5 if is_first else 0.001)
+        return "primary" if is_first else "hedge"
+
+    holder = asyncio.create_task(hold_slot())
+    await asyncio.sleep(0)
+    tracer = Tracer()
+    with tracer.span(run="r", experiment="e", stage="s", key="k", trial=0, scope="call[0]") as span:
+        # the primary gets the free slot at once; the hedge queues behind the holder
+        assert await client._request_with_retry(straggler) == "hedge"
+    await holder
+
+    assert span.rate_limit_wait_s < 0.02
+    await client.close()